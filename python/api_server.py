@@ -1,80 +1,104 @@
-from flask import Flask, request, jsonify
-import asyncio
+from fastapi import FastAPI, Body, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+from typing import Any, Dict, List, Literal, Optional
+from contextlib import asynccontextmanager
 import logging
-from llm_service import answer_questions_endpoint
+import llm_service
+from llm_service import Question, answer_questions_endpoint, batch_results_endpoint, submit_batch_endpoint
 import os
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+PORT = int(os.getenv('PYTHON_SERVICE_PORT', 5000))
+HOST = os.getenv('PYTHON_SERVICE_HOST', '127.0.0.1')
+DEBUG = os.getenv('PYTHON_SERVICE_DEBUG', 'false').lower() == 'true'
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = Flask(__name__)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Close the pooled connections shared by the OpenAI/Anthropic clients (if a request created them)
+    if llm_service._SERVICE:
+        await llm_service._SERVICE.http_client.aclose()
+
+app = FastAPI(
+    title='LLM Poll Answering Service',
+    version='1.0.0',
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
+)
 
-@app.route('/health', methods=['GET'])
-def health_check():
+class AnswerQuestionsRequest(BaseModel):
+    questions: List[Question]
+    context: Optional[str] = None
+
+@app.get('/health')
+async def health_check():
     """Health check endpoint"""
-    return jsonify({
+    return {
         'status': 'healthy',
         'service': 'LLM Poll Answering Service',
         'version': '1.0.0'
-    })
+    }
 
-@app.route('/answer-questions', methods=['POST'])
-def answer_questions():
-    """Main endpoint for answering poll questions"""
+@app.post('/answer-questions')
+async def answer_questions(payload: AnswerQuestionsRequest, mode: Literal['online', 'batch'] = 'online'):
+    """Main endpoint for answering poll questions (mode=batch: submit to the discounted Batch API)"""
     try:
-        data = request.get_json()
-        
-        if not data:
-            return jsonify({'error': 'No JSON data provided'}), 400
-        
-        questions = data.get('questions', [])
-        context = data.get('context', None)
-        
-        if not questions:
-            return jsonify({'error': 'No questions provided'}), 400
-        
-        # Validate question format
-        for q in questions:
-            required_fields = ['id', 'text', 'type']
-            if not all(field in q for field in required_fields):
-                return jsonify({
-                    'error': f'Question missing required fields: {required_fields}'
-                }), 400
-        
-        # Process questions asynchronously
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-        try:
-            result = loop.run_until_complete(
-                answer_questions_endpoint(questions, context)
-            )
-        finally:
-            loop.close()
-        
+        if not payload.questions:
+            return ORJSONResponse({'error': 'No questions provided'}, status_code=400)
+
+        if mode == 'batch':
+            result = await submit_batch_endpoint(payload.questions, payload.context)
+            if 'error' in result:
+                return ORJSONResponse(result, status_code=500)
+            return ORJSONResponse(result, status_code=202)
+
+        result = await answer_questions_endpoint(payload.questions, payload.context)
+
         if 'error' in result:
-            return jsonify(result), 500
-        
-        return jsonify(result)
-        
+            return ORJSONResponse(result, status_code=500)
+
+        return result
+
     except Exception as e:
         logger.error(f"Error in answer_questions endpoint: {e}")
-        return jsonify({
+        return ORJSONResponse({
             'error': 'Internal server error',
             'details': str(e)
-        }), 500
+        }, status_code=500)
+
+@app.post('/answer-questions/batch/{batch_id}')
+async def batch_results(batch_id: str, payload: AnswerQuestionsRequest):
+    """Fetch answers for a batch submitted with mode=batch (send the same questions again)"""
+    try:
+        result = await batch_results_endpoint(batch_id, payload.questions)
 
-@app.route('/test-question', methods=['POST'])
-def test_single_question():
+        if 'error' in result:
+            return ORJSONResponse(result, status_code=500)
+        if result['status'] != 'completed':
+            return ORJSONResponse(result, status_code=202)
+
+        return result
+
+    except Exception as e:
+        logger.error(f"Error in batch_results endpoint: {e}")
+        return ORJSONResponse({
+            'error': 'Internal server error',
+            'details': str(e)
+        }, status_code=500)
+
+@app.post('/test-question')
+async def test_single_question(data: Optional[Dict[str, Any]] = Body(None)):
     """Test endpoint for a single question"""
     try:
-        data = request.get_json()
-        
         # Create a test question if none provided
         if not data:
             data = {
@@ -85,7 +109,7 @@ def test_single_question():
                     {'value': 'no', 'label': 'No'}
                 ]
             }
-        
+
         # Add required fields
         test_question = {
             'id': 1,
@@ -94,43 +118,36 @@ def test_single_question():
             'options': data.get('options', []),
             'required': data.get('required', True)
         }
-        
+
         # Process the question
         questions = [test_question]
         context = data.get('context', 'This is a test question')
-        
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-        try:
-            result = loop.run_until_complete(
-                answer_questions_endpoint(questions, context)
-            )
-        finally:
-            loop.close()
-        
-        return jsonify({
+
+        result = await answer_questions_endpoint(questions, context)
+
+        return {
             'question': test_question,
             'result': result
-        })
-        
+        }
+
     except Exception as e:
         logger.error(f"Error in test_question endpoint: {e}")
-        return jsonify({
+        return ORJSONResponse({
             'error': 'Test failed',
             'details': str(e)
-        }), 500
+        }, status_code=500)
 
-@app.route('/stats', methods=['GET'])
-def get_stats():
+@app.get('/stats')
+async def get_stats():
     """Get service statistics"""
     # This would ideally be stored in a persistent way
     # For now, return basic service info
-    return jsonify({
+    return {
         'service': 'LLM Poll Answering Service',
         'endpoints': [
             '/health - Health check',
-            '/answer-questions - Answer poll questions',
+            '/answer-questions - Answer poll questions (?mode=batch for the offline Batch API)',
+            '/answer-questions/batch/<batch_id> - Fetch results of a submitted batch',
             '/test-question - Test single question',
             '/stats - Service statistics'
         ],
@@ -141,39 +158,59 @@ def get_stats():
             'text',
             'rating'
         ]
-    })
+    }
 
-@app.errorhandler(404)
-def not_found(error):
-    return jsonify({
+@app.exception_handler(RequestValidationError)
+async def validation_error(request: Request, exc: RequestValidationError):
+    # Keep the 400 + {'error': ...} contract the Node.js client expects
+    details = [
+        f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+        for error in exc.errors()
+    ]
+    return ORJSONResponse({
+        'error': 'Invalid request body',
+        'details': details
+    }, status_code=400)
+
+@app.exception_handler(404)
+async def not_found(request: Request, exc: Exception):
+    return ORJSONResponse({
         'error': 'Endpoint not found',
         'available_endpoints': [
             '/health',
             '/answer-questions',
+            '/answer-questions/batch/<batch_id>',
             '/test-question',
             '/stats'
         ]
-    }), 404
+    }, status_code=404)
 
-@app.errorhandler(500)
-def internal_error(error):
-    logger.error(f"Internal server error: {error}")
-    return jsonify({
+@app.exception_handler(500)
+async def internal_error(request: Request, exc: Exception):
+    logger.error(f"Internal server error: {exc}")
+    return ORJSONResponse({
         'error': 'Internal server error',
         'details': 'Check server logs for more information'
-    }), 500
+    }, status_code=500)
 
 if __name__ == '__main__':
-    port = int(os.getenv('PYTHON_SERVICE_PORT', 5000))
-    host = os.getenv('PYTHON_SERVICE_HOST', '127.0.0.1')
-    debug = os.getenv('PYTHON_SERVICE_DEBUG', 'false').lower() == 'true'
-    
-    logger.info(f"Starting LLM service on {host}:{port}")
-    logger.info(f"Debug mode: {debug}")
-    
-    app.run(
-        host=host,
-        port=port,
-        debug=debug,
-        threaded=True
-    )
\ No newline at end of file
+    # Development only - production runs: gunicorn -c gunicorn_conf.py api_server:app
+    import uvicorn
+
+    try:
+        import uvloop
+        uvloop.install()
+        loop = 'uvloop'
+    except ImportError:
+        loop = 'asyncio'
+
+    logger.info(f"Starting LLM service on {HOST}:{PORT}")
+    logger.info(f"Debug mode: {DEBUG}")
+
+    uvicorn.run(
+        'api_server:app' if DEBUG else app,
+        host=HOST,
+        port=PORT,
+        reload=DEBUG,
+        loop=loop
+    )
@@ -0,0 +1,19 @@
+"""Production server settings: gunicorn -c gunicorn_conf.py api_server:app"""
+import multiprocessing
+import os
+from dotenv import load_dotenv
+from uvicorn.workers import UvicornWorker
+
+# Load environment variables
+load_dotenv()
+
+class UvloopWorker(UvicornWorker):
+    """Uvicorn worker pinned to uvloop + httptools"""
+    CONFIG_KWARGS = {'loop': 'uvloop', 'http': 'httptools'}
+
+bind = f"{os.getenv('PYTHON_SERVICE_HOST', '127.0.0.1')}:{os.getenv('PYTHON_SERVICE_PORT', 5000)}"
+workers = int(os.getenv('PYTHON_SERVICE_WORKERS', 2 * multiprocessing.cpu_count() + 1))
+# Forked workers inherit this, so each one takes its share of the provider rate limits
+os.environ['PYTHON_SERVICE_WORKERS'] = str(workers)
+worker_class = 'gunicorn_conf.UvloopWorker'
+keepalive = 75
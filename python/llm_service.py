@@ -1,251 +1,746 @@
 import os
 import json
 import re
+import orjson
 import asyncio
+import contextlib
+import functools
 import random
-from typing import Dict, List, Optional, Union
-from dataclasses import dataclass
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Union
+from pydantic import BaseModel
 import logging
-from tenacity import retry, stop_after_attempt, wait_exponential
+import numpy as np
+import ahocorasick
+from tenacity import AsyncRetrying, retry_if_exception_type, stop_after_attempt, wait_exponential
 
 # LLM Client imports
 import openai
-from anthropic import Anthropic
+import anthropic
+from anthropic import AsyncAnthropic
 import httpx
+from aiolimiter import AsyncLimiter
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+# Read configuration once at import
+_OPENAI_KEY = os.getenv('OPENAI_API_KEY')
+_ANTHROPIC_KEY = os.getenv('ANTHROPIC_API_KEY')
+_SEMANTIC_CACHE = os.getenv('LLM_SEMANTIC_CACHE', 'false').lower() == 'true'
+_RACE_PROVIDERS = os.getenv('LLM_RACE_PROVIDERS', 'false').lower() == 'true'
+_WORKERS = max(1, int(os.getenv('PYTHON_SERVICE_WORKERS', 1)))
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-@dataclass
-class Question:
+# Transient provider failures worth retrying; anything else falls back immediately
+# (APITimeoutError subclasses APIConnectionError, so timeouts are covered)
+_RETRYABLE_ERRORS = (
+    openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError,
+    anthropic.APIConnectionError, anthropic.RateLimitError, anthropic.InternalServerError
+)
+
+def _retrying() -> AsyncRetrying:
+    """Retry policy shared by the per-question and batched provider calls"""
+    return AsyncRetrying(
+        retry=retry_if_exception_type(_RETRYABLE_ERRORS),
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=4, max=10),
+        reraise=True
+    )
+
+# Batch prompts budget ~80 output tokens per answer; 40 questions keeps a request
+# under the 4096-token output limit of gpt-3.5-turbo and claude-3-haiku
+_BATCH_TOKENS_PER_QUESTION = 80
+_MAX_BATCH_QUESTIONS = 40
+
+# Patterns used on every LLM response, compiled once
+_RATING_RE = re.compile(r'\b([1-9]|10)\b')
+_YES_WORDS = frozenset(('yes', 'true', 'agree', 'correct'))
+_NO_WORDS = frozenset(('no', 'false', 'disagree', 'incorrect'))
+
+@functools.lru_cache(maxsize=1024)
+def _render_question(text: str, question_type: str, labels: tuple) -> str:
+    """Render the question-specific part of a prompt (memoized: polls repeat questions)"""
+    prompt = f"Question: {text}\n"
+    prompt += f"Type: {question_type}\n"
+    
+    if labels:
+        prompt += "Options:\n"
+        for i, label in enumerate(labels, 1):
+            prompt += f"{i}. {label}\n"
+    
+    prompt += "\nPlease provide a human-like answer."
+    
+    return prompt
+
+@functools.lru_cache(maxsize=256)
+def _label_automaton(labels: tuple) -> ahocorasick.Automaton:
+    """Aho-Corasick automaton mapping each lower-cased option label to its first index (memoized per option list)"""
+    automaton = ahocorasick.Automaton()
+    for i, label in enumerate(labels):
+        if label and label not in automaton:
+            automaton.add_word(label, i)
+    if len(automaton):
+        automaton.make_automaton()
+    return automaton
+
+def _context_block(context: Optional[str]) -> str:
+    """Render the shared context prefix of a prompt"""
+    # Shared context goes first so consecutive prompts keep a common, cacheable prefix
+    return f"Context: {context}\n\n" if context else ""
+
+def _load_json_object(text: str) -> Optional[Dict]:
+    """Decode the JSON object in an LLM response: whole text first, then the outermost braces"""
+    try:
+        data = orjson.loads(text)
+    except orjson.JSONDecodeError:
+        start = text.find('{')
+        end = text.rfind('}')
+        if start == -1 or end <= start:
+            return None
+        data = orjson.loads(text[start:end + 1])
+    
+    return data if isinstance(data, dict) else None
+
+# Pydantic models double as the API schema, so validated requests reach the service without conversion
+class Question(BaseModel):
     id: int
     text: str
     type: str  # 'single-choice', 'multiple-choice', 'yes-no', 'text', 'rating'
-    options: List[Dict[str, str]]
+    options: List[Dict[str, Any]] = []
     required: bool = True
 
-@dataclass
-class Answer:
+class Answer(BaseModel):
     question_id: int
-    value: Union[str, List[str]]
+    value: Any  # Kept exactly as the model returned it (a lax Union coerces true/false to 1/0)
     confidence: float
     reasoning: Optional[str] = None
 
 class LLMService:
+    _SYSTEM_RULES = """You are answering poll/survey questions as a typical human would. 
+
+IMPORTANT RULES:
+1. Give realistic, human-like answers - avoid showing superhuman knowledge
+2. For impossible questions (like listing all mayors of a country), respond with uncertainty
+3. Add natural human speech patterns like "I think", "probably", "not sure"
+4. Keep answers concise and natural
+5. For multiple choice, pick the most reasonable option
+6. For rating questions, avoid extreme scores unless warranted
+7. Show some uncertainty - humans don't know everything
+
+"""
+
+    _SYSTEM_PROMPT = _SYSTEM_RULES + """Return your answer in this exact JSON format:
+{
+    "answer": "your answer here",
+    "confidence": 0.8,
+    "reasoning": "brief explanation"
+}"""
+
+    _BATCH_SYSTEM_PROMPT = _SYSTEM_RULES + """You will be given several numbered questions (Q1, Q2, ...). Answer every one of them.
+
+Return your answers in this exact JSON format, one entry per question:
+{
+    "answers": [
+        {"id": 1, "answer": "your answer here", "confidence": 0.8, "reasoning": "brief explanation"}
+    ]
+}"""
+
+    _ANTHROPIC_SYSTEM = [{"type": "text", "text": _SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}]
+    _BATCH_ANTHROPIC_SYSTEM = [{"type": "text", "text": _BATCH_SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}]
+
     def __init__(self):
         self.openai_client = None
         self.anthropic_client = None
+        # One connection pool shared by both providers so TLS sessions are reused across requests
+        self.http_client = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=100)
+        )
         self.setup_clients()
         
+        # Token buckets for the providers' default per-minute request limits; the buckets are
+        # per process, so each server worker gets an equal share
+        self._openai_rate_limiter = AsyncLimiter(max_rate=3500 / _WORKERS, time_period=60)
+        self._anthropic_rate_limiter = AsyncLimiter(max_rate=1000 / _WORKERS, time_period=60)
+        
         # Cost tracking
         self.total_cost = 0.0
         self.request_count = 0
+        self._billed_batches: set = set()
+        
+        # Answer cache: exact key lookup first, then (optionally) embedding similarity
+        self._exact_cache: OrderedDict = OrderedDict()
+        self.cache_max_size = 1024
+        self.cache_hits = 0
+        self.semantic_cache_enabled = _SEMANTIC_CACHE
+        self.semantic_threshold = 0.92
+        self._embedding_keys: List[tuple] = []
+        self._embeddings: Optional[np.ndarray] = None
+        self._embedding_norms: Optional[np.ndarray] = None
+        self._embedding_memo: Dict[str, np.ndarray] = {}
         
-        # Response patterns for human-like answers
+        # Query both providers and keep the first answer (doubles cost; for latency-critical use only)
+        self.race_providers = _RACE_PROVIDERS
+        
+        # Per-service RNGs: avoid the lock on the shared module-level generator
+        self._rng = random.Random()
+        self._np_rng = np.random.default_rng()
+        
+        # Response patterns for human-like answers (tuples: cheaper to choose from)
         self.human_patterns = {
-            'uncertainty': [
+            'uncertainty': (
                 "I'm not entirely sure, but I think",
                 "If I had to guess, I'd say",
                 "From what I remember",
                 "I believe",
                 "As far as I know"
-            ],
-            'confidence': [
+            ),
+            'confidence': (
                 "I'm pretty confident that",
                 "I'm fairly certain",
                 "I think it's safe to say",
                 "I'm quite sure"
-            ],
-            'hedging': [
+            ),
+            'hedging': (
                 "probably", "likely", "I suppose", "perhaps", 
                 "it seems to me", "in my opinion", "I'd say"
-            ]
+            )
         }
 
     def setup_clients(self):
         """Initialize LLM clients based on available API keys"""
-        if os.getenv('OPENAI_API_KEY'):
-            self.openai_client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        if _OPENAI_KEY:
+            self.openai_client = openai.AsyncOpenAI(
+                api_key=_OPENAI_KEY,
+                http_client=self.http_client,
+                max_retries=0  # generate_answer's tenacity loop is the only retry layer
+            )
             logger.info("OpenAI client initialized")
         
-        if os.getenv('ANTHROPIC_API_KEY'):
-            self.anthropic_client = Anthropic(api_key=os.getenv('ANTHROPIC_API_KEY'))
+        if _ANTHROPIC_KEY:
+            self.anthropic_client = AsyncAnthropic(
+                api_key=_ANTHROPIC_KEY,
+                http_client=self.http_client,
+                max_retries=0
+            )
             logger.info("Anthropic client initialized")
         
         if not self.openai_client and not self.anthropic_client:
             logger.warning("No LLM clients available - set OPENAI_API_KEY or ANTHROPIC_API_KEY")
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-    async def generate_answer(self, question: Question, context: Optional[str] = None) -> Answer:
-        """Generate an answer for a given question"""
+    async def generate_answer(self, question: Question, ctx_block: str = "") -> Answer:
+        """Generate an answer for a given question (`ctx_block`: the poll context from _context_block)"""
+        cached = await self._get_cached_answer(question, ctx_block)
+        if cached:
+            return cached
+        
         try:
-            # Choose the cheapest available model
-            if self.openai_client:
-                response = await self._generate_openai_answer(question, context)
-            elif self.anthropic_client:
-                response = await self._generate_anthropic_answer(question, context)
-            else:
+            if not self.openai_client and not self.anthropic_client:
                 raise Exception("No LLM clients available")
             
+            # Retry transient API failures without blocking sibling questions
+            async for attempt in _retrying():
+                with attempt:
+                    if self.race_providers and self.openai_client and self.anthropic_client:
+                        content = await self._race_providers(
+                            self._generate_openai_answer(question, ctx_block),
+                            self._generate_anthropic_answer(question, ctx_block)
+                        )
+                    # Choose the cheapest available model
+                    elif self.openai_client:
+                        content = await self._generate_openai_answer(question, ctx_block)
+                    else:
+                        content = await self._generate_anthropic_answer(question, ctx_block)
+            
             self.request_count += 1
-            return response
+            
+            # Only answers the model actually gave are cached, never text-extraction guesses
+            answer = self._decode_json_answer(question, content)
+            if answer is None:
+                return self._parse_text_response(question, content)
+            
+            await self._cache_answer(question, ctx_block, answer)
+            return answer
             
         except Exception as e:
             logger.error(f"Failed to generate answer: {e}")
             # Fallback to random answer
             return self._generate_fallback_answer(question)
 
-    async def _generate_openai_answer(self, question: Question, context: Optional[str] = None) -> Answer:
-        """Generate answer using OpenAI (cheapest model)"""
+    async def generate_answers_batch(self, questions: List[Question], ctx_block: str = "") -> Dict[int, Answer]:
+        """Answer questions with one LLM request per chunk of up to 40, keyed by position in `questions`"""
+        if not self.openai_client and not self.anthropic_client:
+            raise Exception("No LLM clients available")
+        
+        offsets = range(0, len(questions), _MAX_BATCH_QUESTIONS)
+        results = await asyncio.gather(
+            *[self._generate_answers_chunk(questions[i:i + _MAX_BATCH_QUESTIONS], ctx_block) for i in offsets],
+            return_exceptions=True
+        )
+        
+        # A failed chunk leaves its questions uncovered for the per-question fallback
+        answers = {}
+        for offset, result in zip(offsets, results):
+            if isinstance(result, Exception):
+                end = min(offset + _MAX_BATCH_QUESTIONS, len(questions))
+                logger.warning(f"Batch request for questions {offset + 1}-{end} failed: {result}")
+                continue
+            answers.update({offset + index: answer for index, answer in result.items()})
+        
+        return answers
+
+    async def _generate_answers_chunk(self, questions: List[Question], ctx_block: str = "") -> Dict[int, Answer]:
+        """Answer a chunk of questions with a single LLM request"""
+        # Retry transient failures here: falling back to per-question requests would multiply traffic
+        async for attempt in _retrying():
+            with attempt:
+                if self.race_providers and self.openai_client and self.anthropic_client:
+                    answers = await self._race_providers(
+                        self._generate_openai_answers_batch(questions, ctx_block),
+                        self._generate_anthropic_answers_batch(questions, ctx_block)
+                    )
+                elif self.openai_client:
+                    answers = await self._generate_openai_answers_batch(questions, ctx_block)
+                else:
+                    answers = await self._generate_anthropic_answers_batch(questions, ctx_block)
+
+        self.request_count += 1
+        return answers
+
+    @contextlib.contextmanager
+    def _charge_if_cancelled(self, cost: float):
+        """Add a request's cost if it is cancelled in flight (a race loser is still billed by the provider)"""
         try:
-            prompt = self._build_prompt(question, context)
-            
-            response = self.openai_client.chat.completions.create(
-                model="gpt-3.5-turbo",  # Cheapest option
-                messages=[
-                    {"role": "system", "content": self._get_system_prompt()},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=150,
-                timeout=30
-            )
-            
-            # Track cost (approximate)
-            self.total_cost += 0.002  # Rough estimate for gpt-3.5-turbo
-            
-            content = response.choices[0].message.content
-            return self._parse_llm_response(question, content)
-            
-        except Exception as e:
-            logger.error(f"OpenAI API error: {e}")
+            yield
+        except asyncio.CancelledError:
+            self.total_cost += cost
             raise
 
-    async def _generate_anthropic_answer(self, question: Question, context: Optional[str] = None) -> Answer:
-        """Generate answer using Anthropic Claude"""
+    async def _race_providers(self, *calls):
+        """Run provider calls concurrently and return the first successful result, cancelling the rest"""
+        pending = {asyncio.create_task(call) for call in calls}
+        error = None
         try:
-            prompt = self._build_prompt(question, context)
-            
-            response = self.anthropic_client.messages.create(
-                model="claude-3-haiku-20240307",  # Cheapest Claude model
-                max_tokens=150,
-                temperature=0.7,
-                messages=[
-                    {"role": "user", "content": f"{self._get_system_prompt()}\n\n{prompt}"}
-                ],
-                timeout=30
-            )
-            
-            # Track cost (approximate)
-            self.total_cost += 0.001  # Rough estimate for Claude Haiku
-            
-            content = response.content[0].text
-            return self._parse_llm_response(question, content)
-            
-        except Exception as e:
-            logger.error(f"Anthropic API error: {e}")
-            raise
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+            # Let the losers unwind so their cost is recorded before the winner is returned
+            await asyncio.gather(*pending, return_exceptions=True)
 
-    def _get_system_prompt(self) -> str:
-        """Get system prompt for LLM"""
-        return """You are answering poll/survey questions as a typical human would. 
+    async def _generate_openai_answers_batch(self, questions: List[Question], ctx_block: str = "") -> Dict[int, Answer]:
+        """Generate answers for a batch of questions using one OpenAI request"""
+        prompt = self._build_batch_prompt(questions, ctx_block)
 
-IMPORTANT RULES:
-1. Give realistic, human-like answers - avoid showing superhuman knowledge
-2. For impossible questions (like listing all mayors of a country), respond with uncertainty
-3. Add natural human speech patterns like "I think", "probably", "not sure"
-4. Keep answers concise and natural
-5. For multiple choice, pick the most reasonable option
-6. For rating questions, avoid extreme scores unless warranted
-7. Show some uncertainty - humans don't know everything
+        async with self._openai_rate_limiter:
+            with self._charge_if_cancelled(0.002):
+                response = await self.openai_client.chat.completions.create(
+                    model="gpt-3.5-turbo",
+                    messages=[
+                        {"role": "system", "content": self._get_system_prompt(batch=True)},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.7,
+                    max_tokens=_BATCH_TOKENS_PER_QUESTION * len(questions),
+                    timeout=30
+                )
 
-Return your answer in this exact JSON format:
-{
-    "answer": "your answer here",
-    "confidence": 0.8,
-    "reasoning": "brief explanation"
-}"""
+        # Track cost (approximate)
+        self.total_cost += 0.002  # Rough estimate for gpt-3.5-turbo
 
-    def _build_prompt(self, question: Question, context: Optional[str] = None) -> str:
-        """Build prompt for the LLM"""
-        prompt = f"Question: {question.text}\n"
-        prompt += f"Type: {question.type}\n"
+        content = response.choices[0].message.content
+        return self._parse_batch_response(questions, content)
+
+    async def _generate_anthropic_answers_batch(self, questions: List[Question], ctx_block: str = "") -> Dict[int, Answer]:
+        """Generate answers for a batch of questions using one Anthropic request"""
+        prompt = self._build_batch_prompt(questions, ctx_block)
+
+        async with self._anthropic_rate_limiter:
+            with self._charge_if_cancelled(0.001):
+                response = await self.anthropic_client.messages.create(
+                    model="claude-3-haiku-20240307",
+                    max_tokens=_BATCH_TOKENS_PER_QUESTION * len(questions),
+                    temperature=0.7,
+                    system=self._get_anthropic_system(batch=True),
+                    messages=[
+                        {"role": "user", "content": prompt}
+                    ],
+                    timeout=30
+                )
+
+        # Track cost (approximate)
+        self.total_cost += 0.001  # Rough estimate for Claude Haiku
+
+        content = response.content[0].text
+        return self._parse_batch_response(questions, content)
+
+    async def _generate_openai_answer(self, question: Question, ctx_block: str = "") -> str:
+        """Get the raw answer completion from OpenAI (cheapest model)"""
+        prompt = self._build_prompt(question, ctx_block)
+
+        async with self._openai_rate_limiter:
+            with self._charge_if_cancelled(0.002):
+                response = await self.openai_client.chat.completions.create(
+                    model="gpt-3.5-turbo",  # Cheapest option
+                    messages=[
+                        {"role": "system", "content": self._get_system_prompt()},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.7,
+                    max_tokens=150,
+                    timeout=30
+                )
+
+        # Track cost (approximate)
+        self.total_cost += 0.002  # Rough estimate for gpt-3.5-turbo
+
+        return response.choices[0].message.content
+
+    async def _generate_anthropic_answer(self, question: Question, ctx_block: str = "") -> str:
+        """Get the raw answer completion from Anthropic Claude"""
+        prompt = self._build_prompt(question, ctx_block)
+
+        async with self._anthropic_rate_limiter:
+            with self._charge_if_cancelled(0.001):
+                response = await self.anthropic_client.messages.create(
+                    model="claude-3-haiku-20240307",  # Cheapest Claude model
+                    max_tokens=150,
+                    temperature=0.7,
+                    system=self._get_anthropic_system(),
+                    messages=[
+                        {"role": "user", "content": prompt}
+                    ],
+                    timeout=30
+                )
+
+        # Track cost (approximate)
+        self.total_cost += 0.001  # Rough estimate for Claude Haiku
+
+        return response.content[0].text
+
+    async def submit_batch(self, questions: List[Question], context: Optional[str] = None) -> str:
+        """Submit questions to the OpenAI Batch API (~50% cheaper, completes within 24h); returns the batch id"""
+        if not self.openai_client:
+            raise Exception("Batch mode requires OPENAI_API_KEY")
+        
+        ctx_block = _context_block(context)
+        lines = [
+            orjson.dumps({
+                "custom_id": f"q{i}-{question.id}",  # position keeps it unique, the id lets poll_batch verify
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": "gpt-3.5-turbo",
+                    "messages": [
+                        {"role": "system", "content": self._get_system_prompt()},
+                        {"role": "user", "content": self._build_prompt(question, ctx_block)}
+                    ],
+                    "temperature": 0.7,
+                    "max_tokens": 150
+                }
+            })
+            for i, question in enumerate(questions)
+        ]
+        
+        batch_file = await self.openai_client.files.create(
+            file=("poll-questions.jsonl", b"\n".join(lines)),
+            purpose="batch"
+        )
+        batch = await self.openai_client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
         
-        if question.options:
-            prompt += "Options:\n"
-            for i, option in enumerate(question.options, 1):
-                prompt += f"{i}. {option.get('label', option.get('value', ''))}\n"
+        logger.info(f"Submitted batch {batch.id} with {len(questions)} questions")
+        return batch.id
+
+    async def poll_batch(self, batch_id: str, questions: List[Question], wait: bool = True,
+                         poll_interval: float = 30.0, max_interval: float = 300.0) -> Optional[List[Answer]]:
+        """Fetch answers for a submitted batch, backing off while it runs (returns None if not done and wait=False)"""
+        if not self.openai_client:
+            raise Exception("Batch mode requires OPENAI_API_KEY")
+        
+        delay = poll_interval
+        while True:
+            batch = await self.openai_client.batches.retrieve(batch_id)
+            if batch.status == "completed":
+                break
+            if batch.status in ("failed", "expired", "cancelled"):
+                raise Exception(f"Batch {batch_id} {batch.status}")
+            if not wait:
+                return None
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, max_interval)
+        
+        # Results are matched by position, so the questions must be the ones that were submitted
+        if batch.request_counts and batch.request_counts.total != len(questions):
+            raise Exception(f"Batch {batch_id} has {batch.request_counts.total} requests "
+                            f"but {len(questions)} questions were given")
+        
+        # A batch can complete with every request failed: then only the error file exists
+        results = {}
+        if batch.output_file_id:
+            output = await self.openai_client.files.content(batch.output_file_id)
+            for line in output.text.splitlines():
+                if line.strip():
+                    item = orjson.loads(line)
+                    results[item["custom_id"]] = item
+        if batch.error_file_id:
+            errors = await self.openai_client.files.content(batch.error_file_id)
+            for line in errors.text.splitlines():
+                if line.strip():
+                    item = orjson.loads(line)
+                    logger.error(f"Batch {batch_id} request {item.get('custom_id')} failed: "
+                                 f"{item.get('error') or item.get('response')}")
+        
+        answers = []
+        completed = 0
+        for i, question in enumerate(questions):
+            item = results.get(f"q{i}-{question.id}")
+            try:
+                content = item["response"]["body"]["choices"][0]["message"]["content"]
+            except (KeyError, IndexError, TypeError):
+                logger.error(f"No batch result for question {question.id}")
+                answers.append(self._generate_fallback_answer(question))
+                continue
+            
+            completed += 1
+            answers.append(self._parse_llm_response(question, content))
+        
+        # Track cost (approximate) once per batch, however often its results are fetched
+        # - batch pricing is half the online rate
+        if batch_id not in self._billed_batches:
+            self._billed_batches.add(batch_id)
+            self.total_cost += 0.001 * completed
+            self.request_count += completed
         
-        if context:
-            prompt += f"\nContext: {context}\n"
+        rolls = self._np_rng.random((len(questions), 2)).tolist()
+        return [self.make_answer_human_like(a, q, rolls[i]) for i, (a, q) in enumerate(zip(answers, questions))]
+
+    def _cache_key(self, question: Question, ctx_block: str = "") -> tuple:
+        """Build the exact-match cache key for a question"""
+        return (
+            question.text.strip().lower(),
+            question.type,
+            tuple((o.get('value'), o.get('label')) for o in question.options),
+            ctx_block
+        )
+
+    async def _get_cached_answer(self, question: Question, ctx_block: str = "") -> Optional[Answer]:
+        """Return a copy of a previously generated answer for this (or a near-identical) question"""
+        key = self._cache_key(question, ctx_block)
+        if key not in self._exact_cache and self.semantic_cache_enabled and self._embedding_keys:
+            key = await self._find_similar_key(key)
         
-        prompt += "\nPlease provide a human-like answer."
+        if key is None or key not in self._exact_cache:
+            return None
         
+        self._exact_cache.move_to_end(key)
+        self.cache_hits += 1
+        answer = self._exact_cache[key].model_copy(deep=True)
+        answer.question_id = question.id
+        return answer
+
+    async def _cache_answer(self, question: Question, ctx_block: str, answer: Answer):
+        """Store a generated answer, evicting the least recently used entries"""
+        key = self._cache_key(question, ctx_block)
+        self._exact_cache[key] = answer.model_copy(deep=True)
+        self._exact_cache.move_to_end(key)
+        
+        if self.semantic_cache_enabled and key not in self._embedding_keys:
+            embedding = await self._embed(key[0])
+            # Re-check after the await: a concurrent call for the same key may have added it
+            # (or the entry may have been evicted meanwhile)
+            if embedding is not None and key in self._exact_cache and key not in self._embedding_keys:
+                self._add_embedding(key, embedding)
+        
+        while len(self._exact_cache) > self.cache_max_size:
+            evicted, _ = self._exact_cache.popitem(last=False)
+            if evicted in self._embedding_keys:
+                self._remove_embedding(self._embedding_keys.index(evicted))
+
+    async def _find_similar_key(self, key: tuple) -> Optional[tuple]:
+        """Find a cached question with the same type/options/context whose text is semantically close"""
+        query = await self._embed(key[0])
+        if query is None:
+            return None
+        
+        similarities = self._embeddings @ query / (self._embedding_norms * np.linalg.norm(query))
+        for index in np.argsort(-similarities):
+            if similarities[index] < self.semantic_threshold:
+                break
+            if self._embedding_keys[index][1:] == key[1:]:
+                return self._embedding_keys[index]
+        
+        return None
+
+    async def _embed(self, text: str) -> Optional[np.ndarray]:
+        """Embed question text for the semantic cache (OpenAI only)"""
+        return (await self._embed_many([text]))[0]
+
+    async def _embed_many(self, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Embed question texts with one request for those not yet memoized"""
+        missing = list(dict.fromkeys(text for text in texts if text not in self._embedding_memo))
+        if missing and self.openai_client:
+            try:
+                async with self._openai_rate_limiter:
+                    response = await self.openai_client.embeddings.create(
+                        model="text-embedding-3-small",
+                        input=missing,
+                        timeout=10
+                    )
+            except Exception as e:
+                logger.warning(f"Embedding request failed, skipping semantic cache: {e}")
+            else:
+                if len(self._embedding_memo) + len(missing) > self.cache_max_size:
+                    self._embedding_memo.clear()
+                for item in response.data:
+                    self._embedding_memo[missing[item.index]] = np.asarray(item.embedding, dtype=np.float32)
+        
+        return [self._embedding_memo.get(text) for text in texts]
+
+    def _add_embedding(self, key: tuple, embedding: np.ndarray):
+        self._embedding_keys.append(key)
+        norm = np.array([np.linalg.norm(embedding)], dtype=np.float32)
+        if self._embeddings is None:
+            self._embeddings = embedding[np.newaxis, :]
+            self._embedding_norms = norm
+        else:
+            self._embeddings = np.vstack([self._embeddings, embedding])
+            self._embedding_norms = np.concatenate([self._embedding_norms, norm])
+
+    def _remove_embedding(self, index: int):
+        del self._embedding_keys[index]
+        self._embeddings = np.delete(self._embeddings, index, axis=0)
+        self._embedding_norms = np.delete(self._embedding_norms, index)
+
+    def _get_system_prompt(self, batch: bool = False) -> str:
+        """Get system prompt for LLM"""
+        return self._BATCH_SYSTEM_PROMPT if batch else self._SYSTEM_PROMPT
+
+    def _get_anthropic_system(self, batch: bool = False) -> List[Dict]:
+        """System prompt as a cacheable block, so repeated requests reuse the provider's prompt cache"""
+        return self._BATCH_ANTHROPIC_SYSTEM if batch else self._ANTHROPIC_SYSTEM
+
+    def _build_prompt(self, question: Question, ctx_block: str = "") -> str:
+        """Build prompt for the LLM"""
+        labels = tuple(option.get('label', option.get('value', '')) for option in question.options)
+        return ctx_block + _render_question(question.text, question.type, labels)
+
+    def _build_batch_prompt(self, questions: List[Question], ctx_block: str = "") -> str:
+        """Build a single numbered prompt covering every question"""
+        prompt = ctx_block
+        for i, question in enumerate(questions, 1):
+            prompt += f"Q{i}: {question.text}\n"
+            prompt += f"Type: {question.type}\n"
+            if question.options:
+                labels = [f"{option.get('label', option.get('value', ''))}" for option in question.options]
+                prompt += f"Options: {' | '.join(labels)}\n"
+            prompt += "\n"
+
+        prompt += "Please provide a human-like answer to each question."
+
         return prompt
 
+    def _parse_batch_response(self, questions: List[Question], response: str) -> Dict[int, Answer]:
+        """Parse a batch LLM response into Answers keyed by question position"""
+        data = _load_json_object(response)
+        if data is None:
+            raise ValueError("No JSON object in batch response")
+
+        answers = {}
+        for item in data.get('answers', []):
+            # Skip malformed items; questions they would have covered fall back individually
+            try:
+                index = int(item.get('id', 0)) - 1
+                if 0 <= index < len(questions):
+                    answers[index] = Answer(
+                        question_id=questions[index].id,
+                        value=item.get('answer', ''),
+                        confidence=float(item.get('confidence', 0.7)),
+                        reasoning=item.get('reasoning', '')
+                    )
+            except (AttributeError, TypeError, ValueError) as e:
+                logger.warning(f"Skipping malformed batch answer {item!r} ({type(e).__name__})")
+
+        if not answers:
+            raise ValueError("Batch response contained no usable answers")
+
+        return answers
+
     def _parse_llm_response(self, question: Question, response: str) -> Answer:
         """Parse LLM response into Answer object"""
+        # Try to parse as JSON first
+        return self._decode_json_answer(question, response) or self._parse_text_response(question, response)
+
+    def _decode_json_answer(self, question: Question, response: str) -> Optional[Answer]:
+        """Build an Answer from the model's JSON reply; None if the reply has no usable JSON"""
         try:
-            # Try to parse as JSON first
-            if '{' in response and '}' in response:
-                json_match = re.search(r'\{.*\}', response, re.DOTALL)
-                if json_match:
-                    data = json.loads(json_match.group())
-                    return Answer(
-                        question_id=question.id,
-                        value=data.get('answer', ''),
-                        confidence=float(data.get('confidence', 0.7)),
-                        reasoning=data.get('reasoning', '')
-                    )
-            
-            # Fallback: extract answer directly
-            answer_value = self._extract_answer_from_text(question, response)
+            data = _load_json_object(response)
+            if data is None:
+                return None
             
             return Answer(
                 question_id=question.id,
-                value=answer_value,
-                confidence=0.7,
-                reasoning="Parsed from text response"
+                value=data.get('answer', ''),
+                confidence=float(data.get('confidence', 0.7)),
+                reasoning=data.get('reasoning', '')
             )
             
-        except Exception as e:
+        except (orjson.JSONDecodeError, KeyError, TypeError, ValueError) as e:
             logger.error(f"Failed to parse LLM response: {e}")
-            return self._generate_fallback_answer(question)
+            return None
+
+    def _parse_text_response(self, question: Question, response: str) -> Answer:
+        """Fallback: extract answer directly from free-form text"""
+        return Answer(
+            question_id=question.id,
+            value=self._extract_answer_from_text(question, response),
+            confidence=0.7,
+            reasoning="Parsed from text response"
+        )
 
     def _extract_answer_from_text(self, question: Question, text: str) -> str:
         """Extract answer from free-form text"""
         text = text.strip()
         
         if question.type == 'yes-no':
-            if any(word in text.lower() for word in ['yes', 'true', 'agree', 'correct']):
+            text_lower = text.lower()
+            if any(word in text_lower for word in _YES_WORDS):
                 return 'yes'
-            elif any(word in text.lower() for word in ['no', 'false', 'disagree', 'incorrect']):
+            elif any(word in text_lower for word in _NO_WORDS):
                 return 'no'
             else:
-                return random.choice(['yes', 'no'])
+                return self._rng.choice(('yes', 'no'))
         
         elif question.type in ['single-choice', 'multiple-choice'] and question.options:
             # Look for option matches in the response
-            for option in question.options:
-                option_text = option.get('label', option.get('value', '')).lower()
-                if option_text in text.lower():
-                    return option.get('value', option.get('label', ''))
+            matched = self._match_option(question.options, text.lower())
+            if matched:
+                return matched.get('value', matched.get('label', ''))
             
             # Fallback: return random option
-            return random.choice(question.options).get('value', question.options[0].get('label', ''))
+            return self._rng.choice(question.options).get('value', question.options[0].get('label', ''))
         
         elif question.type == 'rating':
             # Extract numbers from response
-            numbers = re.findall(r'\b([1-9]|10)\b', text)
+            numbers = _RATING_RE.findall(text)
             if numbers:
                 return numbers[0]
             else:
-                return str(random.randint(3, 7))  # Moderate rating
+                return str(self._rng.randint(3, 7))  # Moderate rating
         
         else:
             # For text questions, return the response or a human-like fallback
@@ -253,21 +748,37 @@ Return your answer in this exact JSON format:
                 return text[:200] + "..."
             return text or "I'm not sure about this one."
 
+    def _match_option(self, options: List[Dict[str, str]], text_lower: str) -> Optional[Dict[str, str]]:
+        """Find the first option (in list order) whose label appears in the (lower-cased) response text"""
+        labels = tuple(str(option.get('label') or option.get('value') or '').lower() for option in options)
+        if len(options) <= 4:
+            for option, label in zip(options, labels):
+                if label and label in text_lower:
+                    return option
+            return None
+        
+        # Larger option lists: single pass over the text with an Aho-Corasick automaton
+        automaton = _label_automaton(labels)
+        if len(automaton) == 0:
+            return None
+        first = min((i for _, i in automaton.iter(text_lower)), default=None)
+        return None if first is None else options[first]
+
     def _generate_fallback_answer(self, question: Question) -> Answer:
         """Generate a fallback answer when LLM fails"""
         if question.type == 'yes-no':
-            value = random.choice(['yes', 'no'])
+            value = self._rng.choice(('yes', 'no'))
         elif question.type in ['single-choice', 'multiple-choice'] and question.options:
-            value = random.choice(question.options).get('value', question.options[0].get('label', ''))
+            value = self._rng.choice(question.options).get('value', question.options[0].get('label', ''))
         elif question.type == 'rating':
-            value = str(random.randint(3, 7))  # Moderate rating
+            value = str(self._rng.randint(3, 7))  # Moderate rating
         else:
-            value = random.choice([
+            value = self._rng.choice((
                 "I'm not sure about this",
                 "I don't have a strong opinion",
                 "I'd need to think about this more",
                 "Not really sure"
-            ])
+            ))
         
         return Answer(
             question_id=question.id,
@@ -276,50 +787,73 @@ Return your answer in this exact JSON format:
             reasoning="Fallback answer due to API failure"
         )
 
-    def make_answer_human_like(self, answer: Answer, question: Question) -> Answer:
-        """Add human-like patterns to answers"""
-        if isinstance(answer.value, str) and question.type == 'text':
-            # Add uncertainty patterns for text answers
-            if random.random() < 0.3:  # 30% chance to add uncertainty
-                pattern = random.choice(self.human_patterns['uncertainty'])
-                answer.value = f"{pattern} {answer.value.lower()}"
-            
-            # Add hedging words
-            if random.random() < 0.2:  # 20% chance
-                hedge = random.choice(self.human_patterns['hedging'])
-                answer.value = f"{answer.value}, {hedge}"
+    def make_answer_human_like(self, answer: Answer, question: Question, rolls: Optional[Sequence[float]] = None) -> Answer:
+        """Add human-like patterns to answers (`rolls`: two pre-drawn uniform [0, 1) values)"""
+        if rolls is None:
+            rolls = (self._rng.random(), self._rng.random())
         
         # Reduce confidence slightly to be more human-like
-        answer.confidence = max(0.2, answer.confidence - random.uniform(0.1, 0.3))
+        answer.confidence = max(0.2, answer.confidence - (0.1 + 0.2 * rolls[0]))
+        
+        if question.type != 'text' or not isinstance(answer.value, str):
+            return answer
+        
+        # One roll covers both independent choices: 30% uncertainty, 20% hedging (6% both)
+        rand = rolls[1]
+        if rand < 0.3:
+            pattern = self._rng.choice(self.human_patterns['uncertainty'])
+            answer.value = f"{pattern} {answer.value}"
+        
+        if rand < 0.06 or 0.3 <= rand < 0.44:
+            hedge = self._rng.choice(self.human_patterns['hedging'])
+            answer.value = f"{answer.value}, {hedge}"
         
         return answer
 
     async def process_poll_questions(self, questions: List[Question], context: Optional[str] = None) -> List[Answer]:
         """Process multiple questions efficiently"""
-        answers = []
+        # The context is shared by every question: render it once, and key the cache on the same value
+        ctx_block = _context_block(context)
         
-        # Process questions in small batches to avoid rate limits
-        batch_size = 3
-        for i in range(0, len(questions), batch_size):
-            batch = questions[i:i + batch_size]
-            
-            # Process batch concurrently
-            tasks = [self.generate_answer(q, context) for q in batch]
-            batch_answers = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            for j, result in enumerate(batch_answers):
-                if isinstance(result, Exception):
-                    logger.error(f"Error processing question {batch[j].id}: {result}")
-                    # Generate fallback answer
-                    result = self._generate_fallback_answer(batch[j])
-                
-                # Make answer more human-like
-                result = self.make_answer_human_like(result, batch[j])
-                answers.append(result)
-            
-            # Small delay between batches
-            if i + batch_size < len(questions):
-                await asyncio.sleep(random.uniform(1, 3))
+        # Embed every uncached question in one request; lookups and stores below reuse the memo
+        if self.semantic_cache_enabled:
+            keys = [self._cache_key(q, ctx_block) for q in questions]
+            await self._embed_many([key[0] for key in keys if key not in self._exact_cache])
+        
+        # Serve repeated questions from the cache
+        cached = await asyncio.gather(*[self._get_cached_answer(q, ctx_block) for q in questions])
+        batch_answers = {i: answer for i, answer in enumerate(cached) if answer is not None}
+        pending = [i for i in range(len(questions)) if i not in batch_answers]
+
+        # Answer everything else with one batched request
+        if pending:
+            try:
+                answered = await self.generate_answers_batch([questions[i] for i in pending], ctx_block)
+                for position, answer in answered.items():
+                    batch_answers[pending[position]] = answer
+                await asyncio.gather(*[
+                    self._cache_answer(questions[pending[position]], ctx_block, answer)
+                    for position, answer in answered.items()
+                ])
+            except Exception as e:
+                logger.warning(f"Batch answering failed, falling back to per-question requests: {e}")
+
+        # Any question the batch did not cover goes through the per-question path
+        # (all at once - the rate limiters throttle only when a provider limit is near)
+        missing = [i for i in pending if i not in batch_answers]
+        tasks = [self.generate_answer(questions[j], ctx_block) for j in missing]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        
+        for j, result in zip(missing, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error processing question {questions[j].id}: {result}")
+                # Generate fallback answer
+                result = self._generate_fallback_answer(questions[j])
+            batch_answers[j] = result
+        
+        # Make answers more human-like, drawing every question's random rolls in one call
+        rolls = self._np_rng.random((len(questions), 2)).tolist()
+        answers = [self.make_answer_human_like(batch_answers[i], q, rolls[i]) for i, q in enumerate(questions)]
         
         logger.info(f"Processed {len(questions)} questions. Total cost: ${self.total_cost:.4f}")
         return answers
@@ -330,6 +864,8 @@ Return your answer in this exact JSON format:
             'total_requests': self.request_count,
             'total_cost': round(self.total_cost, 4),
             'avg_cost_per_request': round(self.total_cost / max(1, self.request_count), 4),
+            'cache_hits': self.cache_hits,
+            'cache_size': len(self._exact_cache),
             'openai_available': bool(self.openai_client),
             'anthropic_available': bool(self.anthropic_client)
         }
@@ -338,37 +874,32 @@ Return your answer in this exact JSON format:
         """Reset cost and request tracking"""
         self.total_cost = 0.0
         self.request_count = 0
+        self.cache_hits = 0
+
+_SERVICE: Optional[LLMService] = None
+
+def get_service() -> LLMService:
+    """Return the process-wide LLMService, creating it on first use"""
+    global _SERVICE
+    _SERVICE = _SERVICE or LLMService()
+    return _SERVICE
+
+def _questions_from_data(questions_data: List[Union[Question, Dict]]) -> List[Question]:
+    """Validate raw dicts into Questions; already-validated models pass straight through"""
+    return [q if isinstance(q, Question) else Question.model_validate(q) for q in questions_data]
 
 # API endpoint wrapper for integration with Node.js
-async def answer_questions_endpoint(questions_data: List[Dict], context: Optional[str] = None) -> Dict:
+async def answer_questions_endpoint(questions_data: List[Union[Question, Dict]], context: Optional[str] = None) -> Dict:
     """Main endpoint for answering questions"""
     try:
-        # Convert dict data to Question objects
-        questions = []
-        for q_data in questions_data:
-            questions.append(Question(
-                id=q_data['id'],
-                text=q_data['text'],
-                type=q_data['type'],
-                options=q_data.get('options', []),
-                required=q_data.get('required', True)
-            ))
+        questions = _questions_from_data(questions_data)
         
-        # Initialize service and process questions
-        service = LLMService()
+        # Reuse the shared service and process questions
+        service = get_service()
         answers = await service.process_poll_questions(questions, context)
         
-        # Convert answers to dict format
         result = {
-            'answers': [
-                {
-                    'question_id': a.question_id,
-                    'value': a.value,
-                    'confidence': a.confidence,
-                    'reasoning': a.reasoning
-                }
-                for a in answers
-            ],
+            'answers': [a.model_dump() for a in answers],
             'stats': service.get_stats()
         }
         
@@ -382,6 +913,35 @@ async def answer_questions_endpoint(questions_data: List[Dict], context: Optiona
             'stats': {}
         }
 
+async def submit_batch_endpoint(questions_data: List[Union[Question, Dict]], context: Optional[str] = None) -> Dict:
+    """Submit questions to the provider Batch API for offline answering"""
+    try:
+        batch_id = await get_service().submit_batch(_questions_from_data(questions_data), context)
+        return {'batch_id': batch_id, 'status': 'submitted'}
+        
+    except Exception as e:
+        logger.error(f"Error in submit_batch_endpoint: {e}")
+        return {'error': str(e)}
+
+async def batch_results_endpoint(batch_id: str, questions_data: List[Union[Question, Dict]]) -> Dict:
+    """Check a submitted batch once; answers are returned when it has completed"""
+    try:
+        service = get_service()
+        answers = await service.poll_batch(batch_id, _questions_from_data(questions_data), wait=False)
+        if answers is None:
+            return {'batch_id': batch_id, 'status': 'in_progress'}
+        
+        return {
+            'batch_id': batch_id,
+            'status': 'completed',
+            'answers': [a.model_dump() for a in answers],
+            'stats': service.get_stats()
+        }
+        
+    except Exception as e:
+        logger.error(f"Error in batch_results_endpoint: {e}")
+        return {'error': str(e), 'answers': [], 'stats': {}}
+
 if __name__ == "__main__":
     # Test the service
     async def test_service():